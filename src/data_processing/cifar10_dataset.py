@@ -1,9 +1,8 @@
-from typing import Dict, Union
+from typing import Dict, Tuple, Union
 
 import numpy as np
 import torch
 from torch.utils.data import Dataset
-from torchvision.transforms import transforms
 
 from src.data_processing.cifar_processing import get_train_data, get_test_data
 
@@ -37,18 +36,22 @@ class Cifar10Dataset(Dataset):
     def __getitem__(self, index: int) -> Dict[int, Union[torch.Tensor, int]]:
         """
         All images represented as 3072 vector where first 1024 integers are red, 1024 green, 1024 blue,
-        so they are converted to torch.Tensor with shape (3, 32, 32)
+        so they are converted to uint8 torch.Tensor with shape (3, 32, 32).
+        Scaling and normalization are applied to the whole batch on the device by Normalizer
         """
 
         vector, label = self.data[0][index], self.data[1][index]
-        vector = vector.astype(np.float32) / 255
-        tensor = torch.from_numpy(vector).resize_(3, 32, 32)
-
-        transform = transforms.Normalize((0.49139968, 0.48215827, 0.44653124),
-                                         (0.24703233, 0.24348505, 0.26158768))
-        tensor = transform(tensor)
+        tensor = torch.from_numpy(vector).view(3, 32, 32)
         return {0: tensor, 1: label}
 
+    def to_tensors(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Whole split as uint8 images tensor with shape (N, 3, 32, 32) and int64 labels tensor with shape (N,)
+        """
+        images = torch.from_numpy(np.stack(self.data[0])).view(-1, 3, 32, 32)
+        labels = torch.tensor(self.data[1], dtype=torch.int64)
+        return images, labels
+
     @classmethod
     def label_to_str(cls, label: int) -> str:
         return cls.__label_to_str[label]
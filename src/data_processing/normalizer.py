@@ -0,0 +1,34 @@
+from typing import Optional, Tuple
+
+import torch
+from torch import Tensor
+
+CIFAR10_MEAN = (0.49139968, 0.48215827, 0.44653124)
+CIFAR10_STD = (0.24703233, 0.24348505, 0.26158768)
+
+
+class Normalizer:
+    """
+    Converts a batch of uint8 images with shape (B, 3, H, W) to normalized float32 tensor,
+    (img / 255 - mean) / std is computed as img * scale - shift with both kept on the device.
+    Output can be laid out in channels_last format together with the dtype conversion
+    or written into preallocated float32 buffer to avoid allocation per batch
+    """
+
+    def __init__(
+            self,
+            device: torch.device,
+            mean: Tuple[float, ...] = CIFAR10_MEAN,
+            std: Tuple[float, ...] = CIFAR10_STD,
+            memory_format: torch.memory_format = torch.contiguous_format
+    ):
+        mean = torch.tensor(mean, device=device).view(1, -1, 1, 1)
+        std = torch.tensor(std, device=device).view(1, -1, 1, 1)
+        self.scale = 1 / (255 * std)
+        self.shift = mean / std
+        self.memory_format = memory_format
+
+    def __call__(self, img: Tensor, out: Optional[Tensor] = None) -> Tensor:
+        if out is None:
+            out = torch.empty_like(img, dtype=torch.float32, memory_format=self.memory_format)
+        return out.copy_(img).mul_(self.scale).sub_(self.shift)
@@ -9,6 +9,7 @@ from torch.utils.data import DataLoader, Dataset
 from tqdm import tqdm
 
 from src.data_processing.cifar10_dataset import Cifar10Dataset
+from src.data_processing.normalizer import Normalizer
 from src.data_processing.show_image import show_image
 from src.modules.autoencoder import AutoEncoder
 
@@ -26,6 +27,7 @@ def evaluate_autoencoder(
         test_loader = DataLoader(test_data, batch_size=test_batch_size)
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         model.to(device)
+        normalize = Normalizer(device)
 
         criterion = nn.MSELoss(reduction='mean')
 
@@ -33,6 +35,8 @@ def evaluate_autoencoder(
             total_loss = 0
             for batch in test_loader:
                 img = batch[0].to(device)
+                if img.dtype == torch.uint8:
+                    img = normalize(img)
                 reconstructed = model(img)
                 total_loss += criterion(reconstructed, img).item()
                 bar.update(1)
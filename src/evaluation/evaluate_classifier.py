@@ -9,6 +9,7 @@ from torch.utils.data import DataLoader, Dataset
 from tqdm import tqdm
 
 from src.data_processing.cifar10_dataset import Cifar10Dataset
+from src.data_processing.normalizer import Normalizer
 from src.modules.autoencoder import AutoEncoder
 from src.modules.classifier import Classifier
 
@@ -28,6 +29,7 @@ def evaluate_classifier(
 
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         classifier.to(device)
+        normalize = Normalizer(device)
 
         criterion = nn.CrossEntropyLoss()
 
@@ -38,6 +40,8 @@ def evaluate_classifier(
             total_loss = 0
             for batch in test_loader:
                 img, labels = batch[0].to(device), batch[1].to(device)
+                if img.dtype == torch.uint8:
+                    img = normalize(img)
                 outputs = classifier(img)
                 loss = criterion(outputs, labels)
                 total_loss += loss.item()
@@ -47,9 +51,10 @@ def evaluate_classifier(
                 bar.update(1)
 
         if wandb_login:
-            wandb.log({'evaluate_classifier_loss': total_loss})
-            for name, metrics in metrics:
-                wandb.log({'validation_' + name: metrics(targets, predictions)})
+            log = {'evaluate_classifier_loss': total_loss}
+            for name, metric in metrics:
+                log['validation_' + name] = metric(targets, predictions)
+            wandb.log(log)
 
 
 def main():
@@ -1,4 +1,4 @@
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import torch
 from torch import nn, Tensor
@@ -9,9 +9,13 @@ from os.path import join, normpath
 
 
 class AutoEncoder(nn.Module):
-    def __init__(self, n_channels: int = 3, hidden_size: int = 256):
+    def __init__(self, n_channels: int = 3, hidden_size: int = 256, grad_checkpoint: bool = False):
         super().__init__()
-        self.encoder = Encoder(in_channels=n_channels, num_hidden_units=hidden_size)
+        self.encoder = Encoder(
+            in_channels=n_channels,
+            num_hidden_units=hidden_size,
+            grad_checkpoint=grad_checkpoint
+        )
         self.decoder = Decoder(out_channels=n_channels, num_hidden_units=hidden_size)
 
     def encode(self, x: Tensor) -> Tensor:
@@ -36,8 +40,11 @@ class AutoEncoder(nn.Module):
             'epoch': epoch
         }, join(normpath(path), 'autoencoder_ckp'))
 
-    def save_model(self, path: str):
-        torch.save(self.state_dict(), join(normpath(path), 'autoencoder'))
+    def save_model(self, path: str, state_dict: Optional[Dict] = None):
+        torch.save(
+            state_dict if state_dict is not None else self.state_dict(),
+            join(normpath(path), 'autoencoder')
+        )
 
     @staticmethod
     def load_checkpoint(path: str) -> Tuple[nn.Module, torch.optim.Adam, int]:
@@ -50,10 +57,10 @@ class AutoEncoder(nn.Module):
         return model, optimizer, epoch
 
     @staticmethod
-    def load_model(path: str) -> nn.Module:
+    def load_model(path: str, map_location: Optional[torch.device] = None) -> nn.Module:
         model = AutoEncoder()
         model.load_state_dict(torch.load(
             normpath(path),
-            map_location=torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            map_location=map_location or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         ))
         return model
@@ -1,4 +1,5 @@
 from os.path import join, normpath
+from typing import Dict, Optional
 
 import torch
 from torch import nn, Tensor
@@ -10,6 +11,7 @@ class Classifier(nn.Module):
         self.encoder = encoder
         for param in self.encoder.parameters():
             param.requires_grad = False
+        self.encoder.eval()
         self.model = nn.Sequential(
             nn.Conv2d(in_channels=in_channels, out_channels=in_channels // 4, kernel_size=3),
             nn.ReLU(inplace=True),
@@ -18,11 +20,23 @@ class Classifier(nn.Module):
             nn.Linear(576, n_classes)
         )
 
+    def train(self, mode: bool = True) -> 'Classifier':
+        super().train(mode)
+        # encoder is frozen, so it always stays in evaluation mode
+        self.encoder.eval()
+        return self
+
     def forward(self, x: Tensor) -> Tensor:
-        return self.model(self.encoder(x))
+        # no graph is built for the frozen encoder, so its activations are not kept for backward
+        with torch.no_grad():
+            hidden = self.encoder(x)
+        return self.model(hidden)
 
-    def save(self, path: str):
-        torch.save(self.state_dict(), join(normpath(path), 'classifier'))
+    def save(self, path: str, state_dict: Optional[Dict] = None):
+        torch.save(
+            state_dict if state_dict is not None else self.state_dict(),
+            join(normpath(path), 'classifier')
+        )
 
     @staticmethod
     def load(classifier_path: str, encoder: nn.Module) -> nn.Module:
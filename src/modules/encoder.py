@@ -1,13 +1,15 @@
 import torch
 from torch import nn, Tensor
 from torch.nn import Sequential
+from torch.utils.checkpoint import checkpoint_sequential
 
 from src.modules.residual_block import ResidualBlock
 
 
 class Encoder(nn.Module):
-    def __init__(self, in_channels: int = 3, num_hidden_units: int = 256):
+    def __init__(self, in_channels: int = 3, num_hidden_units: int = 256, grad_checkpoint: bool = False):
         super().__init__()
+        self.grad_checkpoint = grad_checkpoint
         self.model = Sequential(
             nn.Conv2d(
                 in_channels=in_channels,
@@ -30,4 +32,7 @@ class Encoder(nn.Module):
         )
 
     def forward(self, x: Tensor) -> Tensor:
+        if self.grad_checkpoint and self.training and torch.is_grad_enabled():
+            # activations of the first half are recomputed in backward instead of being stored
+            return checkpoint_sequential(self.model, segments=2, input=x, use_reentrant=False)
         return self.model(x)
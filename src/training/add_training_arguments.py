@@ -6,10 +6,23 @@ def add_training_arguments(parser: ArgumentParser):
     parser.add_argument('--lr', type=float, default=3e-4)
     parser.add_argument('--train_batch_size', type=int, default=256)
     parser.add_argument('--test_batch_size', type=int, default=64)
-    parser.add_argument('--num_workers', type=int, default=16)
     parser.add_argument('--n_channels', help='number of channels of images', type=int, default=3)
     parser.add_argument('--hidden_size', help='size of channels of hidden representation', type=int, default=256)
     parser.add_argument('--wandb_login', help='login for wandb to log process', type=str, default=None)
     parser.add_argument('--save_path', help='path to save model', type=str, default=None)
     parser.add_argument('--seed', help='fix random seed', type=int, default=0)
+    parser.add_argument(
+        '--accum_freq',
+        help='number of batches to accumulate gradients over, '
+             'effective batch size is train_batch_size * accum_freq * number of gpus',
+        type=int,
+        default=1
+    )
+    parser.add_argument('--no_amp', help='disable mixed precision training', dest='amp', action='store_false')
+    parser.add_argument('--no_compile', help='disable torch.compile', dest='compile_model', action='store_false')
+    parser.add_argument(
+        '--cuda_graph',
+        help='capture training step into CUDA graph, requires single gpu, accum_freq=1 and bf16 or disabled amp',
+        action='store_true'
+    )
     return parser
@@ -0,0 +1,29 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from torch import nn
+
+
+class CheckpointSaver:
+    """
+    Writes checkpoints in a background thread so disk io overlaps with training.
+    State is copied to cpu before submitting, so later optimizer steps don't change it
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future: Optional[Future] = None
+
+    def save(self, save_fn: Callable[[str, Dict], None], path: str, module: nn.Module):
+        self.wait()
+        state_dict = {k: v.detach().to('cpu', copy=True) for k, v in module.state_dict().items()}
+        self.future = self.executor.submit(save_fn, path, state_dict)
+
+    def wait(self):
+        if self.future is not None:
+            self.future.result()
+            self.future = None
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
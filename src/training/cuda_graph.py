@@ -0,0 +1,39 @@
+from typing import Callable, Tuple
+
+import torch
+from torch import Tensor
+from torch.optim import Optimizer
+
+
+def capture_train_step(
+        forward: Callable[[], Tuple[Tensor, ...]],
+        optimizer: Optimizer,
+        warmup_steps: int = 3
+) -> Tuple[torch.cuda.CUDAGraph, Tuple[Tensor, ...]]:
+    """
+    Records whole training step (forward, backward of the first returned tensor and optimizer step)
+    into a CUDA graph. forward must read inputs from static tensors, every replay reruns it on their
+    current content and overwrites returned tensors. Warmup steps are executed on a side stream before
+    capture as required by CUDA graphs, so they update weights on the data currently in static tensors.
+    Autocast inside forward has to be created with cache_enabled=False
+    """
+    def train_step() -> Tuple[Tensor, ...]:
+        outputs = forward()
+        outputs[0].backward()
+        optimizer.step()
+        return outputs
+
+    stream = torch.cuda.Stream()
+    stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(stream):
+        for _ in range(warmup_steps):
+            optimizer.zero_grad(set_to_none=True)
+            train_step()
+    torch.cuda.current_stream().wait_stream(stream)
+
+    graph = torch.cuda.CUDAGraph()
+    # gradients are allocated from the graph memory pool during capture and reused by every replay
+    optimizer.zero_grad(set_to_none=True)
+    with torch.cuda.graph(graph):
+        static_outputs = train_step()
+    return graph, static_outputs
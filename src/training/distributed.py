@@ -0,0 +1,25 @@
+import os
+from typing import Tuple
+
+import torch
+import torch.distributed as dist
+
+
+def init_distributed() -> Tuple[int, int, int]:
+    """
+    Initializes process group if script was launched with torchrun (e.g. torchrun --nproc_per_node=N),
+    returns rank, local rank and world size. Without torchrun training runs in a single process.
+    """
+    if 'LOCAL_RANK' not in os.environ:
+        return 0, 0, 1
+
+    local_rank = int(os.environ['LOCAL_RANK'])
+    if torch.cuda.is_available():
+        torch.cuda.set_device(local_rank)
+    dist.init_process_group('nccl' if torch.cuda.is_available() else 'gloo')
+    return dist.get_rank(), local_rank, dist.get_world_size()
+
+
+def cleanup_distributed():
+    if dist.is_initialized():
+        dist.destroy_process_group()
@@ -1,16 +1,23 @@
 from argparse import ArgumentParser
+from contextlib import nullcontext
 from typing import Optional
 
 import torch.cuda
 import wandb as wandb
-from torch import nn
-from torch.utils.data import DataLoader
+from torch.nn import functional as F
 from tqdm import tqdm
 
 from src.data_processing.cifar10_dataset import Cifar10Dataset
+from src.data_processing.normalizer import Normalizer
 from src.evaluation.evaluate_autoencoder import evaluate_autoencoder
 from src.modules.autoencoder import AutoEncoder
 from src.training.add_training_arguments import add_training_arguments
+from src.training.checkpoint_saver import CheckpointSaver
+from src.training.cuda_graph import capture_train_step
+from src.training.distributed import cleanup_distributed
+from src.training.training_setup import (
+    setup_training, load_train_shard, accumulation_step, wrap_model, warmup
+)
 
 
 def train_autoencoder(
@@ -18,25 +25,46 @@ def train_autoencoder(
         lr: float = 3e-4,
         train_batch_size: int = 256,
         test_batch_size: int = 64,
-        num_workers: int = 16,
         n_channels: int = 3,
         hidden_size: int = 256,
         wandb_login: Optional[str] = None,
         save_path: Optional[str] = None,
         seed: int = 0,
+        amp: bool = True,
+        accum_freq: int = 1,
+        compile_model: bool = True,
+        cuda_graph: bool = False,
+        grad_checkpoint: bool = False,
 ):
-    torch.manual_seed(seed)
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    setup = setup_training(seed, amp, accum_freq, cuda_graph)
+    device = setup.device
 
     train_data, test_data = Cifar10Dataset('train'), Cifar10Dataset('test')
-    train_loader = DataLoader(train_data, batch_size=train_batch_size, num_workers=num_workers)
-    autoencoder = AutoEncoder(n_channels=n_channels, hidden_size=hidden_size)
-    autoencoder.to(device)
+    train_images, _, n_batches = load_train_shard(train_data, setup, train_batch_size)
+    autoencoder = AutoEncoder(n_channels=n_channels, hidden_size=hidden_size, grad_checkpoint=grad_checkpoint)
+    autoencoder.to(device, memory_format=torch.channels_last)
+    model = wrap_model(autoencoder, setup, compile_model)
+
+    normalize = Normalizer(device, memory_format=torch.channels_last)
+    static_img = torch.zeros(
+        (train_batch_size, *train_images.shape[1:]), device=device
+    ).contiguous(memory_format=torch.channels_last)
+
+    optimizer = torch.optim.Adam(
+        autoencoder.parameters(), lr=lr, fused=device.type == 'cuda', capturable=setup.use_cuda_graph
+    )
+    scaler = torch.cuda.amp.GradScaler(enabled=setup.use_scaler)
+    saver = CheckpointSaver()
+
+    def forward():
+        with torch.autocast('cuda', dtype=setup.amp_dtype, enabled=setup.use_amp, cache_enabled=False):
+            reconstructed = model(static_img)
+            return F.mse_loss(reconstructed, static_img), reconstructed
 
-    optimizer = torch.optim.Adam(autoencoder.parameters(), lr=lr)
-    criterion = nn.MSELoss(reduction='mean')
+    warmup(forward, optimizer, setup)
+    graph, static_loss = None, None
 
-    if wandb_login:
+    if wandb_login and setup.rank == 0:
         wandb.init(project='autoencoder', entity=wandb_login)
         wandb.config = {
             'lr': lr,
@@ -45,25 +73,40 @@ def train_autoencoder(
             'test_batch_size': test_batch_size,
         }
 
-    with tqdm(total=epochs, desc='training') as bar:
+    with tqdm(total=epochs, desc='training', disable=setup.rank != 0) as bar:
         for epoch in range(epochs):
-            epoch_loss = 0
-            for batch in train_loader:
-                optimizer.zero_grad()
-
-                img = batch[0].to(device)
-                reconstructed = autoencoder(img)
-                loss = criterion(reconstructed, img)
+            epoch_loss = torch.zeros((), device=device)
+            if not setup.use_cuda_graph:
+                optimizer.zero_grad(set_to_none=True)
+            for step in range(n_batches):
+                group_size, update = accumulation_step(step, n_batches, accum_freq)
+                batch = slice(step * train_batch_size, (step + 1) * train_batch_size)
+                normalize(train_images[batch], out=static_img)
+
+                if setup.use_cuda_graph:
+                    if graph is None:
+                        graph, (static_loss, _) = capture_train_step(forward, optimizer)
+                    graph.replay()
+                    loss = static_loss
+                else:
+                    with model.no_sync() if setup.distributed and not update else nullcontext():
+                        loss, _ = forward()
+                        scaler.scale(loss / group_size).backward()
+                    if update:
+                        scaler.step(optimizer)
+                        scaler.update()
+                        optimizer.zero_grad(set_to_none=True)
+
+                epoch_loss += loss.detach()
+
+            epoch_loss = epoch_loss.item() / n_batches
+            bar.update(1)
 
-                loss.backward()
-                optimizer.step()
-                epoch_loss += loss.item()
+            if setup.rank != 0:
+                continue
 
-            epoch_loss /= len(train_loader)
             print(f'Last epoch loss: {epoch_loss}')
 
-            bar.update(1)
-
             evaluate_autoencoder(
                 model=autoencoder,
                 test_data=test_data,
@@ -72,14 +115,22 @@ def train_autoencoder(
             )
 
             if save_path:
-                autoencoder.save_model(save_path)
+                saver.save(autoencoder.save_model, save_path, autoencoder)
 
             if wandb_login:
                 wandb.log({'autoencoder_loss': epoch_loss})
 
+    saver.close()
+    cleanup_distributed()
+
 
 def main():
     parser = ArgumentParser()
+    parser.add_argument(
+        '--grad_checkpoint',
+        help='recompute encoder activations in backward to fit larger batches',
+        action='store_true'
+    )
     parser = add_training_arguments(parser)
     args = parser.parse_args()
     train_autoencoder(
@@ -87,12 +138,16 @@ def main():
         lr=args.lr,
         train_batch_size=args.train_batch_size,
         test_batch_size=args.test_batch_size,
-        num_workers=args.num_workers,
         n_channels=args.n_channels,
         hidden_size=args.hidden_size,
         wandb_login=args.wandb_login,
         save_path=args.save_path,
-        seed=args.seed
+        seed=args.seed,
+        amp=args.amp,
+        accum_freq=args.accum_freq,
+        compile_model=args.compile_model,
+        cuda_graph=args.cuda_graph,
+        grad_checkpoint=args.grad_checkpoint
     )
 
 
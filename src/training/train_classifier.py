@@ -1,4 +1,5 @@
 from argparse import ArgumentParser
+from contextlib import nullcontext
 from functools import partial
 from typing import Optional
 
@@ -6,14 +7,21 @@ import torch
 import wandb
 from sklearn.metrics import accuracy_score, f1_score
 from torch import nn
-from torch.utils.data import DataLoader
+from torch.nn import functional as F
 from tqdm import tqdm
 
 from src.data_processing.cifar10_dataset import Cifar10Dataset
+from src.data_processing.normalizer import Normalizer
 from src.evaluation.evaluate_classifier import evaluate_classifier
 from src.modules.autoencoder import AutoEncoder
 from src.modules.classifier import Classifier
 from src.training.add_training_arguments import add_training_arguments
+from src.training.checkpoint_saver import CheckpointSaver
+from src.training.cuda_graph import capture_train_step
+from src.training.distributed import cleanup_distributed
+from src.training.training_setup import (
+    setup_training, load_train_shard, accumulation_step, wrap_model, warmup
+)
 
 
 def train_classifier(
@@ -22,21 +30,26 @@ def train_classifier(
         lr: float = 3e-4,
         train_batch_size: int = 512,
         test_batch_size: int = 64,
-        num_workers: int = 16,
         hidden_size: int = 256,
         wandb_login: Optional[str] = None,
         save_path: Optional[str] = None,
         seed: int = 0,
+        amp: bool = True,
+        accum_freq: int = 1,
+        compile_model: bool = True,
+        cuda_graph: bool = False,
 ):
-    torch.manual_seed(seed)
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    setup = setup_training(seed, amp, accum_freq, cuda_graph)
+    device = setup.device
 
     classifier = Classifier(encoder, in_channels=hidden_size)
-    classifier.to(device)
+    classifier.to(device, memory_format=torch.channels_last)
+    model = wrap_model(classifier, setup, compile_model)
 
-    train_loader = DataLoader(Cifar10Dataset('train'), batch_size=train_batch_size, num_workers=num_workers)
+    train_data, test_data = Cifar10Dataset('train'), Cifar10Dataset('test')
+    train_images, train_labels, n_batches = load_train_shard(train_data, setup, train_batch_size)
 
-    if wandb_login:
+    if wandb_login and setup.rank == 0:
         wandb.init(project='autoencoder', entity=wandb_login)
         wandb.config = {
             'epochs': epochs,
@@ -46,44 +59,92 @@ def train_classifier(
             'save_path': save_path
         }
 
-    optimizer = torch.optim.Adam(classifier.parameters(), lr=3e-5)
-    criterion = nn.CrossEntropyLoss()
+    normalize = Normalizer(device, memory_format=torch.channels_last)
+    static_img = torch.zeros(
+        (train_batch_size, *train_images.shape[1:]), device=device
+    ).contiguous(memory_format=torch.channels_last)
+    static_labels = torch.zeros_like(train_labels[:train_batch_size])
+
+    optimizer = torch.optim.Adam(
+        classifier.parameters(), lr=3e-5, fused=device.type == 'cuda', capturable=setup.use_cuda_graph
+    )
+    scaler = torch.cuda.amp.GradScaler(enabled=setup.use_scaler)
+    saver = CheckpointSaver()
+
+    def forward():
+        with torch.autocast('cuda', dtype=setup.amp_dtype, enabled=setup.use_amp, cache_enabled=False):
+            outputs = model(static_img)
+            return F.cross_entropy(outputs, static_labels), outputs
+
+    warmup(forward, optimizer, setup)
+    graph, static_loss, static_outputs = None, None, None
 
     metrics = [
         ('accuracy', accuracy_score),
         ('f1', partial(f1_score, average='macro')),
     ]
 
-    with tqdm(total=epochs, desc='training') as bar:
+    with tqdm(total=epochs, desc='training', disable=setup.rank != 0) as bar:
         for epoch in range(epochs):
-            epoch_loss = 0
+            epoch_loss = torch.zeros((), device=device)
+            if not setup.use_cuda_graph:
+                optimizer.zero_grad(set_to_none=True)
             predictions = []
             targets = []
-            for batch in train_loader:
-                optimizer.zero_grad()
+            for step in range(n_batches):
+                group_size, update = accumulation_step(step, n_batches, accum_freq)
+                batch = slice(step * train_batch_size, (step + 1) * train_batch_size)
+                normalize(train_images[batch], out=static_img)
+                static_labels.copy_(train_labels[batch])
+
+                if setup.use_cuda_graph:
+                    if graph is None:
+                        graph, (static_loss, static_outputs) = capture_train_step(forward, optimizer)
+                    graph.replay()
+                    loss, outputs = static_loss, static_outputs
+                else:
+                    with model.no_sync() if setup.distributed and not update else nullcontext():
+                        loss, outputs = forward()
+                        scaler.scale(loss / group_size).backward()
+                    if update:
+                        scaler.step(optimizer)
+                        scaler.update()
+                        optimizer.zero_grad(set_to_none=True)
+
+                epoch_loss += loss.detach()
+                predictions.append(torch.argmax(outputs, dim=1).detach())
+                targets.append(train_labels[batch])
+
+            epoch_loss = epoch_loss.item() / n_batches
+            bar.update(1)
 
-                img, labels = batch[0].to(device), batch[1].to(device)
-                outputs = classifier(img)
-                loss = criterion(outputs, labels)
-                loss.backward()
-                optimizer.step()
-                epoch_loss += loss.item()
-                predictions.extend(torch.argmax(outputs, dim=1).detach().cpu().numpy())
-                targets.extend(labels.detach().cpu().numpy())
+            if setup.rank != 0:
+                continue
 
-            evaluate_classifier(classifier, metrics=metrics, wandb_login=wandb_login)
+            predictions = torch.cat(predictions).cpu().numpy()
+            targets = torch.cat(targets).cpu().numpy()
+
+            evaluate_classifier(
+                classifier,
+                metrics=metrics,
+                test_data=test_data,
+                test_batch_size=test_batch_size,
+                wandb_login=wandb_login
+            )
 
-            epoch_loss /= len(train_loader)
-            bar.update(1)
             print(epoch_loss)
 
             if wandb_login:
-                wandb.log({'classifier_loss': epoch_loss})
+                log = {'classifier_loss': epoch_loss}
                 for name, metric in metrics:
-                    wandb.log({'training_' + name: metric(targets, predictions)})
+                    log['training_' + name] = metric(targets, predictions)
+                wandb.log(log)
 
             if save_path:
-                classifier.save(save_path)
+                saver.save(classifier.save, save_path, classifier)
+
+    saver.close()
+    cleanup_distributed()
 
 
 def main():
@@ -92,7 +153,7 @@ def main():
     parser = add_training_arguments(parser)
     args = parser.parse_args()
     if args.autoencoder_model_path:
-        autoencoder = AutoEncoder.load_model(args.autoencoder_model_path)
+        autoencoder = AutoEncoder.load_model(args.autoencoder_model_path, map_location=torch.device('cpu'))
         print('Training with pre-trained encoder')
     else:
         autoencoder = AutoEncoder()
@@ -107,7 +168,11 @@ def main():
         hidden_size=args.hidden_size,
         wandb_login=args.wandb_login,
         save_path=args.save_path,
-        seed=args.seed
+        seed=args.seed,
+        amp=args.amp,
+        accum_freq=args.accum_freq,
+        compile_model=args.compile_model,
+        cuda_graph=args.cuda_graph
     )
 
 
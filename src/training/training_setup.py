@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import torch
+from torch import nn, Tensor
+from torch.nn.parallel import DistributedDataParallel
+from torch.optim import Optimizer
+
+from src.data_processing.cifar10_dataset import Cifar10Dataset
+from src.training.distributed import init_distributed
+
+
+@dataclass
+class TrainingSetup:
+    rank: int
+    local_rank: int
+    world_size: int
+    device: torch.device
+    use_amp: bool
+    amp_dtype: torch.dtype
+    use_cuda_graph: bool
+
+    @property
+    def distributed(self) -> bool:
+        return self.world_size > 1
+
+    @property
+    def use_scaler(self) -> bool:
+        return self.use_amp and self.amp_dtype is torch.float16
+
+
+def setup_training(seed: int, amp: bool, accum_freq: int, cuda_graph: bool) -> TrainingSetup:
+    """
+    Fixes random seed, enables cudnn autotuning (input shape is fixed) and tf32, initializes distributed
+    training and chooses mixed precision dtype: bf16 where supported, since unlike fp16 it needs no loss scaling
+    """
+    if accum_freq < 1:
+        raise ValueError('accum_freq must be a positive integer.')
+
+    torch.manual_seed(seed)
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.set_float32_matmul_precision('high')
+
+    rank, local_rank, world_size = init_distributed()
+    device = torch.device(f'cuda:{local_rank}' if torch.cuda.is_available() else 'cpu')
+    use_amp = amp and device.type == 'cuda'
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    use_cuda_graph = cuda_graph and device.type == 'cuda'
+    if use_cuda_graph and (world_size > 1 or accum_freq > 1 or (use_amp and amp_dtype is torch.float16)):
+        raise ValueError(
+            'CUDA graph training is not supported with multiple gpus, gradient accumulation or fp16 loss scaling.'
+        )
+    return TrainingSetup(rank, local_rank, world_size, device, use_amp, amp_dtype, use_cuda_graph)
+
+
+def load_train_shard(
+        train_data: Cifar10Dataset,
+        setup: TrainingSetup,
+        batch_size: int
+) -> Tuple[Tensor, Tensor, int]:
+    """
+    Decoded uint8 training set takes 150 MB, so it is kept on the device and batches are its slices.
+    Every process keeps only its own shard, returns its images, labels and number of full batches
+    """
+    n_batches = len(train_data) // (batch_size * setup.world_size)
+    if n_batches == 0:
+        raise ValueError(
+            f'train_batch_size * number of gpus must not exceed training set size of {len(train_data)}.'
+        )
+    images, labels = train_data.to_tensors()
+    shard = slice(setup.rank, None, setup.world_size)
+    return images[shard].to(setup.device), labels[shard].to(setup.device), n_batches
+
+
+def accumulation_step(step: int, n_batches: int, accum_freq: int) -> Tuple[int, bool]:
+    """
+    Returns size of the accumulation group the step belongs to and whether optimizer steps after it.
+    Last micro-batches of the epoch may form a shorter group, it is stepped as well
+    """
+    group_size = min(accum_freq, n_batches - step // accum_freq * accum_freq)
+    update = (step + 1) % accum_freq == 0 or step == n_batches - 1
+    return group_size, update
+
+
+def wrap_model(module: nn.Module, setup: TrainingSetup, compile_model: bool) -> nn.Module:
+    """
+    Wraps module in DistributedDataParallel and compiles it, the wrappers share its parameters.
+    Compilation is skipped with manually captured CUDA graph
+    """
+    model = module
+    if setup.distributed:
+        model = DistributedDataParallel(
+            module, device_ids=[setup.local_rank] if setup.device.type == 'cuda' else None
+        )
+    if compile_model and not setup.use_cuda_graph and setup.device.type == 'cuda' and hasattr(torch, 'compile'):
+        model = torch.compile(model, mode='max-autotune')
+    return model
+
+
+def warmup(forward: Callable[[], Tuple[Tensor, ...]], optimizer: Optimizer, setup: TrainingSetup, steps: int = 3):
+    """
+    Runs forward and backward without updating weights, so cudnn autotuning and compilation happen
+    before the first real batch. CUDA graph capture runs its own warmup
+    """
+    if setup.device.type != 'cuda' or setup.use_cuda_graph:
+        return
+    for _ in range(steps):
+        forward()[0].backward()
+        optimizer.zero_grad(set_to_none=True)